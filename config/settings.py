@@ -39,6 +39,7 @@ EMAIL_FOLDER = os.getenv('EMAIL_FOLDER', 'INBOX')
 # Nouveaux paramètres OAuth2 pour Gmail
 GMAIL_CREDENTIALS_PATH = os.getenv('GMAIL_CREDENTIALS_PATH', 'credentials/gmail_credentials.json')
 GMAIL_TOKEN_PATH = os.getenv('GMAIL_TOKEN_PATH', 'credentials/gmail_token.json')
+GMAIL_HISTORY_PATH = os.getenv('GMAIL_HISTORY_PATH', 'credentials/gmail_history_id')  # Dernier historyId traité (notifications push)
 
 # Paramètres de la base de données
 DATABASE_PATH = "database/car_listings.db"
@@ -56,4 +57,5 @@ CONTACT_EMAIL = os.getenv('CONTACT_EMAIL', EMAIL_ACCOUNT)
 # Paramètres de l'estimateur de valeur
 PROXY_SERVER = os.getenv('PROXY_SERVER')  # Serveur proxy si nécessaire
 ZIPCODE = os.getenv('ZIPCODE', '1410')  # Code postal pour l'estimation (Waterloo)
-HEADLESS_BROWSER = True  # Exécuter le navigateur en mode invisible
\ No newline at end of file
+HEADLESS_BROWSER = True  # Exécuter le navigateur en mode invisible
+CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR', '')  # Profil Chrome conservé entre les exécutions (optionnel, un seul navigateur à la fois)
\ No newline at end of file
@@ -0,0 +1,46 @@
+# convert_token.py
+import os
+import sys
+import pickle
+
+from config.settings import GMAIL_TOKEN_PATH
+from utils.helpers import logger
+
+def convert_legacy_token(token_file=GMAIL_TOKEN_PATH):
+    """
+    Convertit une seule fois l'ancien token pickle (même chemin avec
+    l'extension .pickle) en JSON, puis supprime le fichier pickle.
+    
+    À n'exécuter que sur un fichier pickle créé par l'application : le
+    chargement d'un pickle peut exécuter du code arbitraire.
+    
+    Args:
+        token_file (str): Chemin du token JSON à créer
+    
+    Returns:
+        bool: True si la conversion a réussi, False sinon
+    """
+    legacy_token_file = os.path.splitext(token_file)[0] + '.pickle'
+    if not os.path.exists(legacy_token_file):
+        logger.error(f"Aucun ancien token trouvé: {legacy_token_file}")
+        return False
+    
+    if os.path.exists(token_file):
+        logger.error(f"Le token JSON existe déjà: {token_file}")
+        return False
+    
+    try:
+        with open(legacy_token_file, 'rb') as token:
+            creds = pickle.load(token)
+        with open(token_file, 'w') as token:
+            token.write(creds.to_json())
+    except Exception as e:
+        logger.error(f"Erreur lors de la conversion de l'ancien token: {str(e)}")
+        return False
+    
+    os.remove(legacy_token_file)
+    logger.info(f"Ancien token '{legacy_token_file}' converti en '{token_file}' et supprimé.")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if convert_legacy_token() else 1)
@@ -2,11 +2,14 @@
 import os
 import logging
 from datetime import datetime
-from pymongo import MongoClient, DESCENDING
-from pymongo.errors import DuplicateKeyError, ConnectionFailure
+from pymongo import MongoClient, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
 
 from utils.helpers import logger
 
+# Champs calculés ou de suivi, conservés lors de la mise à jour d'une annonce
+PRESERVED_FIELDS = ('estimated_value', 'suggested_offer', 'discount_percentage', 'contacted')
+
 class MongoDatabase:
     """
     Gestion de la base de données MongoDB pour Lovacar.
@@ -82,6 +85,7 @@ class MongoDatabase:
             self.db.listings.create_index([('price', 1)])
             self.db.listings.create_index([('make', 1), ('model', 1)])
             self.db.listings.create_index([('discount_percentage', -1)])
+            self.db.listings.create_index([('source', 1), ('scraped_at', 1)])
             
             logger.info("Base de données MongoDB initialisée")
             return True
@@ -94,6 +98,10 @@ class MongoDatabase:
         """
         Stocke les annonces dans la base de données.
         
+        Toutes les annonces sont envoyées en une seule opération groupée
+        d'upserts sur l'URL, au lieu d'une recherche suivie d'une insertion
+        ou d'une mise à jour par annonce.
+        
         Args:
             listings (list): Liste des annonces à stocker
             
@@ -104,56 +112,64 @@ class MongoDatabase:
             if not self.connect():
                 return {'nb_inserts': 0, 'nb_updates': 0}
         
-        nb_inserts = 0
-        nb_updates = 0
+        now = datetime.now()
+        operations = []
         
         for listing in listings:
-            try:
-                # Vérifier si l'annonce existe déjà
-                existing = self.db.listings.find_one({'url': listing.get('url')})
-                
-                if existing:
-                    # Mettre à jour l'annonce existante
-                    listing['updated_at'] = datetime.now()
-                    
-                    # Conserver les champs calculés s'ils existent déjà
-                    if existing.get('estimated_value'):
-                        listing['estimated_value'] = existing.get('estimated_value')
-                    if existing.get('suggested_offer'):
-                        listing['suggested_offer'] = existing.get('suggested_offer')
-                    if existing.get('discount_percentage'):
-                        listing['discount_percentage'] = existing.get('discount_percentage')
-                    if existing.get('contacted'):
-                        listing['contacted'] = existing.get('contacted')
-                    
-                    self.db.listings.update_one(
-                        {'_id': existing['_id']},
-                        {'$set': listing}
-                    )
-                    
-                    nb_updates += 1
-                    logger.debug(f"Annonce mise à jour: {listing.get('title')}")
+            if not listing.get('url'):
+                logger.warning(f"Annonce sans URL ignorée: {listing.get('title')}")
+                continue
+            
+            # Les champs calculés ou de suivi déjà présents en base ne sont
+            # jamais écrasés par une nouvelle extraction
+            on_insert = {k: v for k, v in listing.items() if k in PRESERVED_FIELDS}
+            on_insert.update({
+                'created_at': now,
+                'contacted': False,
+                'visited': False
+            })
+            
+            # Une valeur absente de l'email (None) n'efface pas celle déjà
+            # connue : elle n'est écrite qu'à la création de l'annonce
+            fields = {}
+            for k, v in listing.items():
+                if k in on_insert:
+                    continue
+                if v is None:
+                    on_insert[k] = v
                 else:
-                    # Ajouter des champs supplémentaires
-                    listing['created_at'] = datetime.now()
-                    listing['updated_at'] = datetime.now()
-                    listing['contacted'] = False
-                    listing['visited'] = False
-                    
-                    # Insérer la nouvelle annonce
-                    self.db.listings.insert_one(listing)
-                    
-                    nb_inserts += 1
-                    logger.debug(f"Nouvelle annonce ajoutée: {listing.get('title')}")
+                    fields[k] = v
             
-            except DuplicateKeyError:
-                # Gérer le cas où l'URL est en double (race condition)
-                logger.warning(f"URL en double: {listing.get('url')}")
-                continue
+            # price_text décrit price : sans prix extrait, le texte connu est
+            # conservé avec lui
+            if listing.get('price') is None and 'price_text' in fields:
+                on_insert['price_text'] = fields.pop('price_text')
+            fields['updated_at'] = now
             
-            except Exception as e:
-                logger.error(f"Erreur lors du stockage de l'annonce: {str(e)}")
-                continue
+            operations.append(UpdateOne(
+                {'url': listing['url']},
+                {'$set': fields, '$setOnInsert': on_insert},
+                upsert=True
+            ))
+        
+        if not operations:
+            return {'nb_inserts': 0, 'nb_updates': 0}
+        
+        try:
+            result = self.db.listings.bulk_write(operations, ordered=False)
+            nb_inserts = result.upserted_count
+            nb_updates = result.matched_count
+        
+        except BulkWriteError as e:
+            # Les autres opérations sont appliquées même si certaines échouent
+            # (ex: URL en double insérée en parallèle)
+            nb_inserts = e.details.get('nUpserted', 0)
+            nb_updates = e.details.get('nMatched', 0)
+            logger.warning(f"{len(e.details.get('writeErrors', []))} annonces non stockées: {str(e)}")
+        
+        except Exception as e:
+            logger.error(f"Erreur lors du stockage des annonces: {str(e)}")
+            return {'nb_inserts': 0, 'nb_updates': 0}
         
         logger.info(f"Stockage terminé: {nb_inserts} inserts, {nb_updates} updates")
         return {'nb_inserts': nb_inserts, 'nb_updates': nb_updates}
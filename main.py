@@ -31,7 +31,7 @@ def init_database():
     
     return db
 
-def scrape_emails(db, max_emails=5, unread_only=True, mark_as_read=True):
+def scrape_emails(db, max_emails=5, unread_only=True, mark_as_read=True, incremental=False):
     """
     Utilise l'API Gmail pour extraire les annonces des emails AutoScout24.
     
@@ -40,6 +40,7 @@ def scrape_emails(db, max_emails=5, unread_only=True, mark_as_read=True):
         max_emails (int): Nombre maximum d'emails à traiter
         unread_only (bool): Si True, ne traite que les emails non lus
         mark_as_read (bool): Si True, marque les emails traités comme lus
+        incremental (bool): Si True, ne traite que les emails reçus depuis le dernier traitement
         
     Returns:
         int: Nombre total d'annonces extraites et stockées
@@ -53,7 +54,8 @@ def scrape_emails(db, max_emails=5, unread_only=True, mark_as_read=True):
     listings = scraper.process_emails(
         max_emails=max_emails, 
         unread_only=unread_only,
-        mark_as_read=mark_as_read
+        mark_as_read=mark_as_read,
+        incremental=incremental
     )
     
     if not listings:
@@ -203,6 +205,48 @@ def display_best_deals(db, min_discount=15, limit=5):
         print(f"   Remise: {discount_percentage:.1f}%")
         print(f"   URL: {url}")
 
+def run_pipeline(scrape=False, estimate=False, calculate=False, deals=False,
+                 max_emails=5, max_estimates=5, min_discount=15,
+                 mark_as_read=False, incremental=False):
+    """
+    Exécute les étapes demandées du traitement Lovacar.
+    
+    Args:
+        scrape (bool): Extraire les annonces des emails
+        estimate (bool): Estimer les valeurs
+        calculate (bool): Calculer les offres
+        deals (bool): Afficher les meilleures affaires
+        max_emails (int): Nombre maximum d'emails à traiter
+        max_estimates (int): Nombre maximum d'annonces à estimer
+        min_discount (float): Pourcentage minimum de remise pour les meilleures affaires
+        mark_as_read (bool): Marquer les emails comme lus après traitement
+        incremental (bool): Ne traiter que les emails reçus depuis le dernier traitement
+    """
+    logger.info("Démarrage de l'application Lovacar")
+    
+    # Initialiser la base de données MongoDB
+    db = init_database()
+    
+    try:
+        # Exécuter les actions demandées
+        if scrape:
+            scrape_emails(db, max_emails=max_emails, mark_as_read=mark_as_read, incremental=incremental)
+        
+        if estimate:
+            estimate_car_values(db, limit=max_estimates)
+        
+        if calculate:
+            calculate_offers(db)
+        
+        if deals:
+            display_best_deals(db, min_discount=min_discount)
+    
+    finally:
+        # Fermer la connexion à la base de données
+        db.close()
+    
+    logger.info("Fin de l'application Lovacar")
+
 def main():
     """
     Point d'entrée principal de l'application.
@@ -218,44 +262,32 @@ def main():
     parser.add_argument("--deals", action="store_true", help="Afficher les meilleures affaires")
     parser.add_argument("--min-discount", type=float, default=15, help="Pourcentage minimum de remise pour les meilleures affaires")
     parser.add_argument("--mark-read", action="store_true", help="Marquer les emails comme lus après traitement")
+    parser.add_argument("--incremental", action="store_true", help="Ne traiter que les emails reçus depuis le dernier traitement (notifications push)")
     
     args = parser.parse_args()
     
-    logger.info("Démarrage de l'application Lovacar")
-    
-    # Initialiser la base de données MongoDB
-    db = init_database()
+    # Déterminer les actions à exécuter
+    run_scrape = args.all or args.scrape
+    run_estimate = args.all or args.estimate
+    run_calculate = args.all or args.calculate
+    run_deals = args.all or args.deals
     
-    try:
-        # Déterminer les actions à exécuter
-        run_scrape = args.all or args.scrape
-        run_estimate = args.all or args.estimate
-        run_calculate = args.all or args.calculate
-        run_deals = args.all or args.deals
-        
-        # Si aucune action spécifiée, afficher l'aide
-        if not (run_scrape or run_estimate or run_calculate or run_deals):
-            parser.print_help()
-            return
-        
-        # Exécuter les actions demandées
-        if run_scrape:
-            scrape_emails(db, max_emails=args.emails, mark_as_read=args.mark_read)
-        
-        if run_estimate:
-            estimate_car_values(db, limit=args.estimates)
-        
-        if run_calculate:
-            calculate_offers(db)
-        
-        if run_deals:
-            display_best_deals(db, min_discount=args.min_discount)
-    
-    finally:
-        # Fermer la connexion à la base de données
-        db.close()
+    # Si aucune action spécifiée, afficher l'aide
+    if not (run_scrape or run_estimate or run_calculate or run_deals):
+        parser.print_help()
+        return
     
-    logger.info("Fin de l'application Lovacar")
+    run_pipeline(
+        scrape=run_scrape,
+        estimate=run_estimate,
+        calculate=run_calculate,
+        deals=run_deals,
+        max_emails=args.emails,
+        max_estimates=args.estimates,
+        min_discount=args.min_discount,
+        mark_as_read=args.mark_read,
+        incremental=args.incremental
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
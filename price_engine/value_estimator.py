@@ -12,21 +12,57 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 import sqlite3
 
 from config.settings import (
     ESTIMATE_URL, DATABASE_PATH, USER_AGENTS, 
-    ZIPCODE, REQUEST_DELAY, HEADLESS_BROWSER
+    ZIPCODE, REQUEST_DELAY, HEADLESS_BROWSER, CHROME_PROFILE_DIR
 )
 from utils.helpers import logger, wait_random_delay
 
+# Services d'arrière-plan de Chrome inutiles pour l'estimation
+# (mises à jour, traduction, synchronisation, rapports de plantage...)
+CHROME_BACKGROUND_FLAGS = (
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-breakpad",
+    "--disable-client-side-phishing-detection",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,InterestFeedContentSuggestions",
+)
+
+# Cookie posé par OneTrust une fois la boîte de dialogue des cookies fermée
+CONSENT_COOKIE = "OptanonAlertBoxClosed"
+
+# Boutons d'acceptation des cookies, essayés dans l'ordre (libellé, localisateur) :
+# sélecteurs CSS d'abord, le texte du bouton (XPath) en dernier recours
+COOKIE_BUTTON_LOCATORS = (
+    ("Bouton cookie par ID", (By.ID, "onetrust-accept-btn-handler")),
+    ("Bouton cookie alternatif", (By.CSS_SELECTOR, "button.onetrust-accept-btn-handler")),
+    # Classe du bouton jaune (visible sur les screenshots)
+    ("Bouton jaune cookie", (By.CSS_SELECTOR, "button[class*='btn-primary'], button[class*='btn-yellow']")),
+    ("Bouton 'Accepter tout'", (By.XPATH, "//button[contains(text(), 'Accepter tout')]")),
+)
+
 class AutoScoutValueEstimator:
     """
     Estimateur de valeur de véhicules utilisant l'outil d'AutoScout24.
     """
     
+    # Chemin du chromedriver, résolu une seule fois par processus
+    _driver_path = None
+    
+    # Dernier bouton de cookies ayant fonctionné, essayé en premier
+    _cookie_locator = None
+    
     def __init__(self, headless=HEADLESS_BROWSER):
         """
         Initialise l'estimateur avec un navigateur Selenium.
@@ -37,6 +73,7 @@ class AutoScoutValueEstimator:
         self.headless = headless
         self.driver = None
         self.estimate_url = ESTIMATE_URL
+        self.cookies_accepted = False
         
         # Créer le dossier pour les captures d'écran
         self.screenshots_dir = "logs/screenshots"
@@ -61,16 +98,45 @@ class AutoScoutValueEstimator:
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-dev-shm-usage")
             options.add_argument("--window-size=1920,1080")
+            for flag in CHROME_BACKGROUND_FLAGS:
+                options.add_argument(flag)
+            
+            # Ne pas charger les images ni les polices web, ni demander les
+            # notifications : seul le formulaire d'estimation est utilisé
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_argument("--disable-remote-fonts")
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2
+            })
             
-            # Utiliser un User-Agent aléatoire
-            options.add_argument(f"--user-agent={random.choice(USER_AGENTS)}")
+            # driver.get() rend la main dès que le DOM est prêt, sans attendre
+            # les publicités et traqueurs ; les éléments sont attendus explicitement
+            options.page_load_strategy = "eager"
             
-            # Initialiser le driver
-            service = Service(ChromeDriverManager().install())
+            # Profil persistant (optionnel) : le cache HTTP et le consentement
+            # aux cookies sont réutilisés d'une exécution à l'autre. Un seul
+            # navigateur à la fois peut l'utiliser ; le User-Agent reste alors
+            # le même pour aller avec les cookies conservés
+            if CHROME_PROFILE_DIR:
+                options.add_argument(f"--user-data-dir={os.path.abspath(CHROME_PROFILE_DIR)}")
+                options.add_argument("--profile-directory=Default")
+                user_agent = USER_AGENTS[0]
+            else:
+                # Utiliser un User-Agent aléatoire
+                user_agent = random.choice(USER_AGENTS)
+            options.add_argument(f"--user-agent={user_agent}")
+            
+            # Initialiser le driver (ChromeDriverManager interroge le réseau :
+            # son résultat est conservé pour les drivers suivants)
+            if AutoScoutValueEstimator._driver_path is None:
+                AutoScoutValueEstimator._driver_path = ChromeDriverManager().install()
+            service = Service(AutoScoutValueEstimator._driver_path)
             self.driver = webdriver.Chrome(service=service, options=options)
+            self.cookies_accepted = False
             
-            # Configurer un délai d'attente implicite plus long
-            self.driver.implicitly_wait(20)  # Augmenté à 20 secondes
+            # Pas d'attente implicite : elle s'ajouterait à chaque attente
+            # explicite (WebDriverWait) qui échoue
             
             # Masquer Selenium
             self.driver.execute_script(
@@ -84,12 +150,34 @@ class AutoScoutValueEstimator:
             logger.error(f"Erreur lors de l'initialisation du driver: {str(e)}")
             return False
     
+    def _ensure_driver(self):
+        """
+        Réutilise le driver existant tant que sa session est active,
+        sinon en crée un nouveau.
+        
+        Returns:
+            bool: True si un driver est disponible, False sinon
+        """
+        if self.driver is not None:
+            # session_id reste défini si Chrome a planté : interroger le navigateur
+            try:
+                self.driver.current_url
+                return True
+            except WebDriverException:
+                logger.warning("Session Selenium perdue, création d'un nouveau driver")
+                self.close()
+        
+        return self.setup_driver()
+    
     def close(self):
         """
         Ferme le navigateur.
         """
         if self.driver:
-            self.driver.quit()
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                logger.warning(f"Erreur lors de la fermeture du driver: {str(e)}")
             self.driver = None
             logger.info("Driver Selenium fermé")
     
@@ -100,89 +188,118 @@ class AutoScoutValueEstimator:
         Returns:
             bool: True si les cookies ont été acceptés, False sinon
         """
+        # Les cookies sont conservés pendant toute la session du navigateur
+        if self.cookies_accepted:
+            return True
+        
         try:
-            # Prendre une capture d'écran avant de gérer les cookies
-            self.save_screenshot("before_cookies")
-            
-            # D'abord, essayer le bouton "Accepter tout"
-            try:
-                accept_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Accepter tout')]"))
-                )
-                accept_button.click()
-                logger.info("Bouton 'Accepter tout' cliqué")
-                time.sleep(2)
+            # Consentement déjà donné dans le profil Chrome : pas de boîte de dialogue
+            if self.driver.get_cookie(CONSENT_COOKIE):
+                logger.info("Consentement aux cookies déjà enregistré")
+                self.cookies_accepted = True
                 return True
-            except (TimeoutException, NoSuchElementException):
-                logger.debug("Bouton 'Accepter tout' non trouvé, essai d'autres sélecteurs")
             
-            # Essayer un autre sélecteur
-            try:
-                accept_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button.onetrust-accept-btn-handler"))
-                )
-                accept_button.click()
-                logger.info("Bouton cookie alternatif cliqué")
-                time.sleep(2)
-                return True
-            except (TimeoutException, NoSuchElementException):
-                logger.debug("Bouton cookie alternatif non trouvé")
+            # Prendre une capture d'écran avant de gérer les cookies
+            self.save_screenshot("before_cookies")
             
-            # Encore un autre sélecteur
-            try:
-                accept_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-                )
-                accept_button.click()
-                logger.info("Bouton cookie par ID cliqué")
-                time.sleep(2)
-                return True
-            except (TimeoutException, NoSuchElementException):
-                logger.debug("Bouton cookie par ID non trouvé")
+            # Essayer d'abord le bouton qui a fonctionné lors d'un appel précédent
+            locators = sorted(
+                COOKIE_BUTTON_LOCATORS,
+                key=lambda entry: entry[1] != AutoScoutValueEstimator._cookie_locator
+            )
             
-            # Essayer en utilisant la classe du bouton jaune (visible sur les screenshots)
-            try:
-                accept_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(@class, 'btn-primary') or contains(@class, 'btn-yellow')]"))
-                )
-                accept_button.click()
-                logger.info("Bouton jaune cookie cliqué")
-                time.sleep(2)
-                return True
-            except (TimeoutException, NoSuchElementException):
-                logger.debug("Bouton jaune cookie non trouvé")
+            for label, locator in locators:
+                try:
+                    accept_button = WebDriverWait(self.driver, 5).until(
+                        EC.element_to_be_clickable(locator)
+                    )
+                    accept_button.click()
+                    logger.info(f"{label} cliqué")
+                    self.wait_until_hidden(accept_button)
+                    AutoScoutValueEstimator._cookie_locator = locator
+                    self.cookies_accepted = True
+                    return True
+                except (TimeoutException, NoSuchElementException):
+                    logger.debug(f"{label} non trouvé")
             
             # Essayer de cliquer sur le bouton en utilisant JavaScript
             try:
-                accept_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Accepter tout')]")
+                accept_buttons = self.wait_for_elements((By.XPATH, "//button[contains(text(), 'Accepter tout')]"))
                 if accept_buttons:
                     self.driver.execute_script("arguments[0].click();", accept_buttons[0])
                     logger.info("Bouton cookie cliqué via JavaScript")
-                    time.sleep(2)
+                    self.wait_until_hidden(accept_buttons[0])
+                    self.cookies_accepted = True
                     return True
             except Exception as e:
                 logger.debug(f"Échec du clic JavaScript: {str(e)}")
             
             # Si on arrive ici, prendre une capture d'écran pour analyser le problème
-            self.save_screenshot("cookie_dialog_not_handled")
+            self.save_screenshot("cookie_dialog_not_handled", always=True)
             logger.warning("Impossible de gérer la boîte de dialogue des cookies")
             return False
             
         except Exception as e:
             logger.error(f"Erreur lors de la gestion des cookies: {str(e)}")
-            self.save_screenshot("cookie_error")
+            self.save_screenshot("cookie_error", always=True)
+            return False
+    
+    def wait_until_hidden(self, element, timeout=5):
+        """
+        Attend qu'un élément disparaisse de la page (ex: boîte de dialogue
+        fermée, liste d'options refermée après un clic).
+        
+        Args:
+            element (WebElement): Élément à surveiller
+            timeout (int): Délai maximum en secondes
+            
+        Returns:
+            bool: True si l'élément a disparu, False sinon
+        """
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.invisibility_of_element(element))
+            return True
+        except TimeoutException:
+            logger.debug(f"Élément toujours visible après {timeout} secondes")
             return False
     
-    def save_screenshot(self, name):
+    def wait_for_elements(self, locator, timeout=5):
+        """
+        Attend que des éléments apparaissent dans la page (pas d'attente
+        implicite sur le driver).
+        
+        Args:
+            locator (tuple): Localisateur Selenium (By, valeur)
+            timeout (int): Délai maximum en secondes
+            
+        Returns:
+            list: Éléments trouvés, liste vide si aucun n'apparaît à temps
+        """
+        try:
+            return WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_all_elements_located(locator)
+            )
+        except TimeoutException:
+            return []
+    
+    def save_screenshot(self, name, always=False):
         """
         Prend une capture d'écran.
         
+        Les captures des étapes intermédiaires ne servent qu'au débogage et
+        ne sont prises qu'au niveau de log DEBUG ; celles des erreurs sont
+        toujours enregistrées.
+        
         Args:
             name (str): Nom du fichier
+            always (bool): Si True, enregistre la capture quel que soit le niveau de log
             
         Returns:
-            str: Chemin vers la capture d'écran
+            str: Chemin vers la capture d'écran (None si elle n'a pas été prise)
         """
+        if not always and not logger.isEnabledFor(logging.DEBUG):
+            return None
+        
         filename = f"{self.screenshots_dir}/{name}_{int(time.time())}.png"
         self.driver.save_screenshot(filename)
         logger.info(f"Capture d'écran enregistrée: {filename}")
@@ -203,9 +320,8 @@ class AutoScoutValueEstimator:
         Returns:
             dict: Résultat de l'estimation avec prix min/max et valeur moyenne
         """
-        if not self.driver:
-            if not self.setup_driver():
-                return None
+        if not self._ensure_driver():
+            return None
         
         result = {
             "make": make,
@@ -224,8 +340,6 @@ class AutoScoutValueEstimator:
             # Accéder à la page d'estimation
             logger.info(f"Accès à la page d'estimation pour {make} {model}")
             self.driver.get(self.estimate_url)
-            # Attendre plus longtemps pour le chargement complet
-            time.sleep(5)
             
             # Prendre une capture d'écran initiale
             self.save_screenshot(f"initial_page_{make}_{model}")
@@ -235,8 +349,6 @@ class AutoScoutValueEstimator:
                 result["error"] = "Impossible de gérer la boîte de dialogue des cookies"
                 return result
             
-            # Attendre que la page soit chargée après avoir géré les cookies
-            time.sleep(3)
             self.save_screenshot(f"after_cookies_{make}_{model}")
             
             # Saisir la marque
@@ -246,7 +358,6 @@ class AutoScoutValueEstimator:
                 )
                 make_input.click()
                 logger.info("Champ de marque cliqué")
-                time.sleep(2)
                 
                 # Capturer l'écran après le clic sur le champ marque
                 self.save_screenshot(f"after_make_click_{make}")
@@ -260,17 +371,24 @@ class AutoScoutValueEstimator:
                     search_field.clear()
                     search_field.send_keys(make)
                     logger.info(f"Marque '{make}' saisie dans le champ de recherche")
-                    time.sleep(2)
+                    
+                    # Attendre que la liste filtrée apparaisse
+                    try:
+                        make_options = WebDriverWait(self.driver, 5).until(
+                            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li[role='option'], .Select-option"))
+                        )
+                    except TimeoutException:
+                        make_options = []
                     
                     # Capturer l'écran après la saisie
                     self.save_screenshot(f"after_make_search_{make}")
                     
                     # Sélectionner le premier élément correspondant
-                    make_options = self.driver.find_elements(By.CSS_SELECTOR, "li[role='option'], .Select-option")
                     if make_options:
+                        option_text = make_options[0].text
                         make_options[0].click()
-                        logger.info(f"Option de marque sélectionnée: {make_options[0].text}")
-                        time.sleep(2)
+                        logger.info(f"Option de marque sélectionnée: {option_text}")
+                        self.wait_until_hidden(make_options[0])
                     else:
                         # Essayer une autre approche si aucune option n'est trouvée
                         logger.warning(f"Aucune option trouvée pour '{make}', essai d'une autre approche")
@@ -279,11 +397,11 @@ class AutoScoutValueEstimator:
                 except (NoSuchElementException, TimeoutException) as e:
                     # Approche 2: Sélection directe par texte
                     logger.info(f"Essai d'approche alternative pour la marque '{make}'")
-                    make_options = self.driver.find_elements(By.XPATH, f"//li[contains(text(), '{make}')]")
+                    make_options = self.wait_for_elements((By.XPATH, f"//li[contains(text(), '{make}')]"))
                     if make_options:
                         make_options[0].click()
                         logger.info(f"Option de marque sélectionnée par texte: {make}")
-                        time.sleep(2)
+                        self.wait_until_hidden(make_options[0])
                     else:
                         # Si toujours pas d'options, essayer avec JavaScript
                         self.driver.execute_script(
@@ -299,14 +417,13 @@ class AutoScoutValueEstimator:
                             """
                         )
                         logger.info(f"Tentative JavaScript pour sélectionner '{make}'")
-                        time.sleep(2)
                 
                 # Capturer l'écran après la sélection de la marque
                 self.save_screenshot(f"after_make_selection_{make}")
                 
             except Exception as e:
                 logger.error(f"Erreur lors de la sélection de la marque: {str(e)}")
-                self.save_screenshot(f"error_make_{make}")
+                self.save_screenshot(f"error_make_{make}", always=True)
                 result["error"] = f"Erreur marque: {str(e)}"
                 return result
             
@@ -324,7 +441,7 @@ class AutoScoutValueEstimator:
             
         except Exception as e:
             logger.error(f"Erreur lors de l'estimation: {str(e)}")
-            self.save_screenshot(f"error_global_{make}_{model}")
+            self.save_screenshot(f"error_global_{make}_{model}", always=True)
             result["error"] = f"Erreur globale: {str(e)}"
             return result
         
@@ -406,58 +523,57 @@ class AutoScoutValueEstimator:
         """
         Traite les annonces sans estimation de valeur.
         
+        Le driver reste ouvert pour les appels suivants : l'appelant le
+        libère avec close().
+        
         Args:
             limit (int): Nombre maximum d'annonces à traiter
             
         Returns:
             int: Nombre d'annonces traitées
         """
-        if not self.setup_driver():
+        if not self._ensure_driver():
             logger.error("Impossible d'initialiser le driver Selenium")
             return 0
         
-        try:
-            listings = self.get_unestimated_listings(limit=limit)
-            if not listings:
-                logger.info("Aucune annonce à estimer")
-                return 0
-            
-            logger.info(f"Estimation de {len(listings)} annonces")
-            estimated_count = 0
-            
-            for listing in listings:
-                make = listing.get("make")
-                model = listing.get("model")
-                year = listing.get("year")
-                mileage = listing.get("mileage")
-                
-                if not make or not model:
-                    logger.warning(f"Marque ou modèle manquant pour l'annonce {listing['id']}")
-                    continue
-                
-                logger.info(f"Estimation pour {make} {model} ({year}, {mileage} km)")
-                estimation = self.estimate_car_value(
-                    make=make,
-                    model=model,
-                    year=str(year) if year else None,
-                    mileage=mileage
-                )
-                
-                if estimation and estimation.get("success"):
-                    if self.update_db_with_estimation(listing["id"], estimation):
-                        estimated_count += 1
-                else:
-                    error = estimation.get("error", "Raison inconnue")
-                    logger.warning(f"Échec de l'estimation pour {make} {model}: {error}")
-                
-                # Pause pour éviter de surcharger le serveur
-                wait_random_delay(*REQUEST_DELAY)
+        listings = self.get_unestimated_listings(limit=limit)
+        if not listings:
+            logger.info("Aucune annonce à estimer")
+            return 0
+        
+        logger.info(f"Estimation de {len(listings)} annonces")
+        estimated_count = 0
+        
+        for listing in listings:
+            make = listing.get("make")
+            model = listing.get("model")
+            year = listing.get("year")
+            mileage = listing.get("mileage")
+            
+            if not make or not model:
+                logger.warning(f"Marque ou modèle manquant pour l'annonce {listing['id']}")
+                continue
             
-            logger.info(f"Estimation terminée, {estimated_count} annonces estimées")
-            return estimated_count
+            logger.info(f"Estimation pour {make} {model} ({year}, {mileage} km)")
+            estimation = self.estimate_car_value(
+                make=make,
+                model=model,
+                year=str(year) if year else None,
+                mileage=mileage
+            )
+            
+            if estimation and estimation.get("success"):
+                if self.update_db_with_estimation(listing["id"], estimation):
+                    estimated_count += 1
+            else:
+                error = estimation.get("error", "Raison inconnue") if estimation else "Raison inconnue"
+                logger.warning(f"Échec de l'estimation pour {make} {model}: {error}")
+            
+            # Pause pour éviter de surcharger le serveur
+            wait_random_delay(*REQUEST_DELAY)
         
-        finally:
-            self.close()
+        logger.info(f"Estimation terminée, {estimated_count} annonces estimées")
+        return estimated_count
 
 # Exemple d'utilisation
 if __name__ == "__main__":
@@ -1,16 +1,132 @@
 # scrapers/gmail_api_scraper.py
 import os
-import pickle
 import re
 import logging
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
+import soupsieve
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax absent : extraction avec BeautifulSoup uniquement
+    LexborHTMLParser = None
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import base64
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from utils.helpers import logger, sanitize_text, extract_number_from_text
+from config.settings import GMAIL_CREDENTIALS_PATH, GMAIL_TOKEN_PATH, GMAIL_HISTORY_PATH
+from utils.helpers import logger, sanitize_text
+
+# Expéditeur des alertes AutoScout24
+AUTOSCOUT_SENDER = 'no-reply@rtm.autoscout24.com'
+
+# Expressions régulières utilisées pour chaque annonce extraite
+_MILEAGE_RE = re.compile(r'(\d+[\s.]?\d*)\s*km')
+_YEAR_RE = re.compile(r'(\d{2})/(\d{4})')
+_URL_RE = re.compile(r'autoscout24\.be/fr/offres/([^?&]+)')
+_DIGITS_RE = re.compile(r'\d+')
+# Prix en euros : espace ou point comme séparateur de milliers (« € 12 250,- »)
+_PRICE_RE = re.compile(r'\d{1,3}(?:[ .]\d{3})+|\d+')
+_CHARSET_RE = re.compile(r'charset="?([\w.:-]+)', re.IGNORECASE)
+
+def _parse_price(price_text):
+    """
+    Extrait le montant entier d'un prix AutoScout24.
+    
+    Args:
+        price_text (str): Prix nettoyé (ex: "€ 12 250,-")
+        
+    Returns:
+        int: Montant en euros, None si aucun nombre n'est trouvé
+    """
+    price_match = _PRICE_RE.search(price_text)
+    if not price_match:
+        return None
+    return int(''.join(_DIGITS_RE.findall(price_match.group())))
+
+
+# Marques dont le nom contient plusieurs mots, les plus longues en premier
+# pour que « Land Rover » ne soit pas confondu avec un préfixe plus court
+_MULTI_WORD_MAKES = tuple(sorted((
+    'Alfa Romeo', 'Aston Martin', 'Land Rover', 'Rolls Royce',
+    'Lynk & Co', 'DS Automobiles',
+), key=len, reverse=True))
+
+
+def _split_make_model(title):
+    """
+    Sépare la marque et le modèle dans le titre d'une annonce.
+    
+    Args:
+        title (str): Titre de l'annonce (ex: "Alfa Romeo Giulia 2.2")
+        
+    Returns:
+        tuple: (marque, modèle), None pour les éléments absents
+    """
+    for make in _MULTI_WORD_MAKES:
+        if title.startswith(make) and title[len(make):len(make) + 1] in ('', ' '):
+            return make, title[len(make):].strip() or None
+    
+    # Le titre est déjà nettoyé (espaces simples) : partition suffit
+    make, _, model = title.partition(' ')
+    return make or None, model or None
+
+
+# Sélecteurs CSS compilés une fois pour le parsing BeautifulSoup
+_SEL_TABLES = soupsieve.compile('table.border-container')
+_SEL_LINKS = soupsieve.compile('a')
+_SEL_TITLE = soupsieve.compile('div.card-title a')
+_SEL_TITLE_ALT = soupsieve.compile('div.card-right-part-ellipse-container a')
+_SEL_PRICE = soupsieve.compile('a.price')
+_SEL_DETAILS = soupsieve.compile('a.small-details')
+_SEL_IMAGE = soupsieve.compile('img[alt="vehicle"]')
+
+# Nombre d'appels regroupés dans une requête batch de l'API Gmail : au-delà
+# de 50, Gmail renvoie des erreurs 429 (rateLimitExceeded)
+GMAIL_BATCH_SIZE = 50
+
+# Scopes Gmail : la lecture suffit au traitement, la modification n'est
+# nécessaire que pour marquer les emails comme lus
+GMAIL_READ_SCOPE = 'https://www.googleapis.com/auth/gmail.readonly'
+GMAIL_MODIFY_SCOPE = 'https://www.googleapis.com/auth/gmail.modify'
+
+# Taille maximale d'une page de résultats de messages.list
+GMAIL_LIST_PAGE_SIZE = 500
+
+# Nombre maximum de threads pour le parsing des emails
+MAX_PARSE_WORKERS = 8
+
+# Réponse partielle de messages.get : uniquement les champs utilisés par
+# _parse_message (en-têtes et corps des parties MIME). Les parties ne sont
+# demandées que sur trois niveaux sous le payload : un conteneur multipart
+# plus profond arrive sans ses parties (voir _parse_message)
+MESSAGE_FIELDS = (
+    'id,internalDate,'
+    'payload(mimeType,headers(name,value),body/data,'
+    'parts(mimeType,headers(name,value),body/data,'
+    'parts(mimeType,headers(name,value),body/data,'
+    'parts(mimeType,headers(name,value),body/data))))'
+)
+
+# Session HTTP partagée pour le rafraîchissement des tokens OAuth2 :
+# la connexion TLS vers le serveur d'authentification est réutilisée
+_auth_session = requests.Session()
+
+def _chunked(items, size):
+    """
+    Découpe une séquence en blocs de taille maximale `size`.
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 class GmailApiScraper:
     """
@@ -19,18 +135,24 @@ class GmailApiScraper:
     Support pour l'authentification non-interactive.
     """
     
-    def __init__(self, credentials_file='credentials/gmail_credentials.json', token_file='credentials/gmail_token.pickle'):
+    def __init__(self, credentials_file=GMAIL_CREDENTIALS_PATH, token_file=GMAIL_TOKEN_PATH,
+                 history_file=GMAIL_HISTORY_PATH):
         """
         Initialise le scraper avec les fichiers d'authentification Google.
         
         Args:
             credentials_file (str): Chemin vers le fichier de credentials OAuth2
-            token_file (str): Chemin vers le fichier de token
+            token_file (str): Chemin vers le fichier de token (JSON)
+            history_file (str): Chemin vers le fichier du dernier historyId traité
         """
         self.credentials_file = credentials_file
         self.token_file = token_file
-        self.scopes = ['https://www.googleapis.com/auth/gmail.readonly']
+        self.history_file = history_file
+        # Scopes demandés lors de l'authentification interactive
+        self.scopes = [GMAIL_READ_SCOPE, GMAIL_MODIFY_SCOPE]
         self.service = None
+        # Vrai si le token permet de marquer les emails comme lus
+        self.can_modify = False
         self.token_refresh_timestamp = None
     
     def is_token_valid(self, creds):
@@ -60,6 +182,44 @@ class GmailApiScraper:
                 
         return True
     
+    def _load_token(self):
+        """
+        Charge le token sauvegardé au format JSON.
+        
+        Un ancien token pickle n'est jamais chargé ici : il doit être
+        converti une fois avec convert_token.py.
+        
+        Returns:
+            Credentials: Les credentials chargées, ou None
+        """
+        if os.path.exists(self.token_file):
+            try:
+                # Scopes enregistrés dans le token (et non self.scopes), pour
+                # pouvoir vérifier ceux qui ont réellement été accordés
+                creds = Credentials.from_authorized_user_file(self.token_file)
+                logger.info("Token existant chargé.")
+                return creds
+            except Exception as e:
+                logger.error(f"Erreur lors du chargement du token: {str(e)}")
+                return None
+        
+        legacy_token_file = os.path.splitext(self.token_file)[0] + '.pickle'
+        if os.path.exists(legacy_token_file):
+            logger.error(f"Ancien token '{legacy_token_file}' non chargé: lancer convert_token.py pour le convertir en JSON")
+        
+        return None
+    
+    def _save_token(self, creds):
+        """
+        Sauvegarde le token au format JSON.
+        
+        Args:
+            creds (Credentials): Les credentials à sauvegarder
+        """
+        with open(self.token_file, 'w') as token:
+            token.write(creds.to_json())
+        logger.info("Token sauvegardé.")
+    
     def authenticate(self, force_interactive=False):
         """
         Authentifie l'application avec l'API Gmail.
@@ -73,19 +233,21 @@ class GmailApiScraper:
         creds = None
         
         # Charger le token existant s'il existe
-        if os.path.exists(self.token_file) and not force_interactive:
-            with open(self.token_file, 'rb') as token:
-                try:
-                    creds = pickle.load(token)
-                    logger.info("Token existant chargé.")
-                except Exception as e:
-                    logger.error(f"Erreur lors du chargement du token: {str(e)}")
+        if not force_interactive:
+            creds = self._load_token()
+        
+        # Seule la lecture est indispensable : un token sans gmail.modify
+        # (obtenu avant son ajout) reste utilisable, sans marquage comme lu
+        if creds and not creds.has_scopes([GMAIL_READ_SCOPE]):
+            logger.warning("Le token ne permet pas de lire les emails, nouveau consentement nécessaire "
+                           "(lancer setup_notifications.py)")
+            creds = None
         
         # Si pas de credentials valides, essayer de rafraîchir
         if not self.is_token_valid(creds):
             if creds and creds.expired and creds.refresh_token:
                 try:
-                    creds.refresh(Request())
+                    creds.refresh(Request(session=_auth_session))
                     logger.info("Token rafraîchi.")
                     self.token_refresh_timestamp = datetime.now().timestamp()
                 except Exception as e:
@@ -109,18 +271,35 @@ class GmailApiScraper:
                     return False
             
             # Sauvegarder le token pour la prochaine fois
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
-                logger.info("Token sauvegardé.")
+            self._save_token(creds)
         
         try:
             # Créer le service Gmail
             self.service = build('gmail', 'v1', credentials=creds)
+            self.can_modify = creds.has_scopes([GMAIL_MODIFY_SCOPE])
             return True
         except Exception as e:
             logger.error(f"Erreur lors de la création du service Gmail: {str(e)}")
             return False
     
+    def _ensure_service(self):
+        """
+        S'assure que le service Gmail est disponible, en ne s'authentifiant
+        qu'au premier appel. Le service conserve ensuite les credentials et
+        rafraîchit lui-même le token expiré, sans relire le fichier de token.
+        
+        Returns:
+            bool: True si le service est disponible, False sinon
+        """
+        if self.service is not None:
+            return True
+        
+        if not self.authenticate():
+            logger.error("Impossible de s'authentifier avec l'API Gmail")
+            return False
+        
+        return True
+    
     def setup_watch(self, topic_name):
         """
         Configure la surveillance des emails pour les notifications push.
@@ -131,10 +310,8 @@ class GmailApiScraper:
         Returns:
             dict: Résultat de la configuration ou None en cas d'échec
         """
-        if self.service is None:
-            if not self.authenticate():
-                logger.error("Impossible de s'authentifier avec l'API Gmail")
-                return None
+        if not self._ensure_service():
+            return None
         
         try:
             # Configurer la surveillance des emails
@@ -147,41 +324,159 @@ class GmailApiScraper:
             ).execute()
             
             logger.info(f"Surveillance des emails configurée: {result}")
+            
+            # Point de départ de la synchronisation incrémentale, sauf si un
+            # historique est déjà suivi (sinon des emails seraient sautés)
+            if result.get('historyId') and self._load_history_id() is None:
+                self._save_history_id(result['historyId'])
+            
             return result
         except Exception as e:
             logger.error(f"Erreur lors de la configuration de la surveillance: {str(e)}")
             return None
     
+    def _load_history_id(self):
+        """
+        Charge le dernier historyId traité.
+        
+        Returns:
+            str: L'historyId, ou None s'il n'a jamais été enregistré
+        """
+        if not os.path.exists(self.history_file):
+            return None
+        
+        with open(self.history_file) as f:
+            history_id = f.read().strip()
+        
+        return history_id or None
+    
+    def _save_history_id(self, history_id):
+        """
+        Enregistre le dernier historyId traité.
+        
+        Args:
+            history_id (str): L'historyId à enregistrer
+        """
+        with open(self.history_file, 'w') as f:
+            f.write(str(history_id))
+    
+    def get_current_history_id(self):
+        """
+        Récupère l'historyId courant de la boîte mail.
+        
+        Returns:
+            str: L'historyId courant, ou None en cas d'échec
+        """
+        if not self._ensure_service():
+            return None
+        
+        try:
+            profile = self.service.users().getProfile(userId='me').execute()
+            return profile.get('historyId')
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'historyId: {str(e)}")
+            return None
+    
+    def fetch_new_emails(self, start_history_id, unread_only=True):
+        """
+        Récupère les emails arrivés dans la boîte de réception depuis
+        `start_history_id`, via l'historique Gmail. Utilisé à la réception
+        d'une notification push, à la place d'une recherche complète.
+        
+        Args:
+            start_history_id (str): Dernier historyId traité
+            unread_only (bool): Si True, ne récupère que les emails non lus
+            
+        Returns:
+            tuple: (liste des emails, nouvel historyId), (None, None) si
+                   l'historique a expiré (recherche complète nécessaire), ou
+                   ([], None) en cas d'erreur temporaire (l'historyId
+                   enregistré ne doit pas avancer)
+        """
+        if not self._ensure_service():
+            return None, None
+        
+        messages = []
+        seen_ids = set()
+        history_id = start_history_id
+        
+        try:
+            history = self.service.users().history()
+            request = history.list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=['messageAdded'],
+                labelId='INBOX'
+            )
+            
+            while request is not None:
+                response = request.execute()
+                history_id = response.get('historyId', history_id)
+                
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        if message['id'] in seen_ids:
+                            continue
+                        if unread_only and 'UNREAD' not in message.get('labelIds', []):
+                            continue
+                        seen_ids.add(message['id'])
+                        messages.append({'id': message['id']})
+                
+                request = history.list_next(request, response)
+            
+            logger.info(f"Trouvé {len(messages)} nouveaux emails depuis l'historique {start_history_id}")
+            return messages, history_id
+        
+        except HttpError as e:
+            # 404 : historyId trop ancien, l'historique n'est plus disponible
+            if e.resp.status == 404:
+                logger.warning(f"Historique Gmail expiré depuis {start_history_id}: {str(e)}")
+                return None, None
+            logger.error(f"Erreur lors de la lecture de l'historique Gmail: {str(e)}")
+            return [], None
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de l'historique Gmail: {str(e)}")
+            return [], None
+    
     def fetch_autoscout_emails(self, max_emails=10, unread_only=True):
         """
         Récupère les emails d'alerte d'AutoScout24.
         
         Args:
-            max_emails (int): Nombre maximum d'emails à récupérer
+            max_emails (int): Nombre maximum d'emails à récupérer (None pour tous)
             unread_only (bool): Si True, ne récupère que les emails non lus
             
         Returns:
-            list: Liste des IDs d'emails récupérés
+            list: Liste des IDs d'emails récupérés, None en cas d'erreur
         """
-        if self.service is None:
-            if not self.authenticate():
-                logger.error("Impossible de s'authentifier avec l'API Gmail")
-                return []
+        if not self._ensure_service():
+            return None
         
         try:
             # Construire la requête de recherche
-            query = 'from:no-reply@rtm.autoscout24.com'
+            query = f'from:{AUTOSCOUT_SENDER}'
             if unread_only:
                 query += ' is:unread'
             
-            # Récupérer les IDs des messages
-            results = self.service.users().messages().list(
+            # Récupérer les IDs des messages, page par page
+            page_size = min(max_emails, GMAIL_LIST_PAGE_SIZE) if max_emails else GMAIL_LIST_PAGE_SIZE
+            messages_api = self.service.users().messages()
+            request = messages_api.list(
                 userId='me', 
                 q=query, 
-                maxResults=max_emails
-            ).execute()
+                maxResults=page_size
+            )
             
-            messages = results.get('messages', [])
+            messages = []
+            while request is not None and (not max_emails or len(messages) < max_emails):
+                results = request.execute()
+                messages.extend(results.get('messages', []))
+                request = messages_api.list_next(request, results)
+            
+            if max_emails:
+                messages = messages[:max_emails]
             
             if not messages:
                 logger.info("Aucun email d'AutoScout24 trouvé")
@@ -192,21 +487,479 @@ class GmailApiScraper:
         
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des emails: {str(e)}")
-            return []
+            return None
+    
+    def _decode_part(self, part):
+        """
+        Décode le corps d'une partie MIME avec le charset déclaré dans son
+        en-tête Content-Type (UTF-8 par défaut).
+        
+        Args:
+            part (dict): Partie MIME retournée par l'API Gmail
+            
+        Returns:
+            str: Contenu décodé
+        """
+        charset = 'utf-8'
+        for header in part.get('headers', []):
+            if header['name'].lower() == 'content-type':
+                charset_match = _CHARSET_RE.search(header['value'])
+                if charset_match:
+                    charset = charset_match.group(1)
+                break
+        
+        data = base64.urlsafe_b64decode(part['body']['data'])
+        try:
+            return data.decode(charset, errors='replace')
+        except LookupError:
+            logger.warning(f"Charset inconnu '{charset}', décodage en UTF-8")
+            return data.decode('utf-8', errors='replace')
+    
+    def _parse_message(self, message, processed_at=None):
+        """
+        Extrait le sujet, la date et le contenu HTML d'un message Gmail.
+        
+        Args:
+            message (dict): Message retourné par l'API Gmail (format 'full')
+            processed_at (str, optional): Date de traitement (ISO), maintenant par défaut
+            
+        Returns:
+            dict: Contenu de l'email
+        """
+        payload = message['payload']
+        headers = {h['name'].lower(): h['value'] for h in payload.get('headers', [])}
+        
+        subject = headers.get('subject')
+        date = headers.get('date')
+        
+        # Rechercher la partie HTML du message dans les conteneurs imbriqués
+        # (ex: multipart/alternative dans multipart/mixed), jusqu'à la
+        # profondeur couverte par MESSAGE_FIELDS ; seuls les conteneurs
+        # multipart/* sont parcourus, les pièces jointes et messages
+        # transférés sont ignorés sans être examinés
+        html_content = None
+        truncated = False
+        stack = [payload]
+        while stack:
+            part = stack.pop()
+            mime_type = part.get('mimeType', '')
+            if mime_type == 'text/html' and part.get('body', {}).get('data'):
+                html_content = self._decode_part(part)
+                break
+            if mime_type.startswith('multipart/'):
+                if 'parts' not in part:
+                    truncated = True
+                stack.extend(reversed(part.get('parts', [])))
+        
+        if html_content is None and truncated:
+            logger.warning(f"Email {message['id']}: parties MIME trop imbriquées pour MESSAGE_FIELDS, contenu HTML non trouvé")
+        
+        return {
+            'id': message['id'],
+            'sender': headers.get('from'),
+            'subject': subject,
+            'date': date,
+            'received_at': int(message.get('internalDate', 0)),
+            'html_content': html_content,
+            'processed_at': processed_at or datetime.now().isoformat()
+        }
     
-    # Le reste des méthodes reste inchangé
     def get_email_content(self, msg_id):
-        # [Code existant inchangé]
-        pass
+        """
+        Récupère le contenu d'un email.
+        
+        Args:
+            msg_id (str): ID de l'email
+            
+        Returns:
+            dict: Contenu de l'email ou None en cas d'échec
+        """
+        if not self._ensure_service():
+            return None
+        
+        try:
+            message = self.service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                format='full',
+                fields=MESSAGE_FIELDS
+            ).execute()
+            
+            return self._parse_message(message)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'email {msg_id}: {str(e)}")
+            return None
+    
+    def get_email_contents(self, msg_ids, processed_at=None):
+        """
+        Récupère le contenu de plusieurs emails en regroupant les appels
+        dans des requêtes batch (un aller-retour HTTP par bloc de 50 emails).
+        
+        Args:
+            msg_ids (list): IDs des emails
+            processed_at (str, optional): Date de traitement (ISO), maintenant par défaut
+            
+        Returns:
+            list: Contenus des emails, dans l'ordre des IDs (None en cas d'échec)
+        """
+        if not self._ensure_service():
+            return [None] * len(msg_ids)
+        
+        contents = {}
+        processed_at = processed_at or datetime.now().isoformat()
+        
+        def on_message(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Erreur lors de la récupération de l'email {request_id}: {str(exception)}")
+                return
+            try:
+                contents[request_id] = self._parse_message(response, processed_at)
+            except Exception as e:
+                logger.error(f"Erreur lors de la lecture de l'email {request_id}: {str(e)}")
+        
+        for chunk in _chunked(msg_ids, GMAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_message)
+            for msg_id in chunk:
+                batch.add(
+                    self.service.users().messages().get(
+                        userId='me', id=msg_id, format='full', fields=MESSAGE_FIELDS
+                    ),
+                    request_id=msg_id
+                )
+            
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération groupée des emails: {str(e)}")
+        
+        return [contents.get(msg_id) for msg_id in msg_ids]
+    
+    def _parse_vehicle_cards(self, html_content):
+        """
+        Extrait les champs bruts de chaque annonce avec selectolax (lexbor).
+        
+        Args:
+            html_content (str): Contenu HTML de l'email
+            
+        Returns:
+            list: Champs bruts (textes et liens) de chaque annonce
+        """
+        tree = LexborHTMLParser(html_content)
+        cards = []
+        
+        for table in tree.css('table.border-container'):
+            # Le filtre sur le texte est évalué par lexbor : seuls les liens
+            # contenant "Détails" remontent en Python
+            details_link = None
+            for link in table.css('a:lexbor-contains("Détails")'):
+                if link.text(strip=True) == "Détails":
+                    details_link = link.attributes.get('href')
+                    break
+            
+            title_elem = table.css_first('div.card-title a') or table.css_first('div.card-right-part-ellipse-container a')
+            price_elem = table.css_first('a.price')
+            details_elem = table.css_first('a.small-details')
+            img_elem = table.css_first('img[alt="vehicle"]')
+            
+            cards.append({
+                "details_link": details_link,
+                "title": title_elem.text() if title_elem else None,
+                "price": price_elem.text() if price_elem else None,
+                "details": details_elem.text() if details_elem else None,
+                "image_url": img_elem.attributes.get('src') if img_elem else None
+            })
+        
+        return cards
     
-    def extract_car_listings(self, html_content):
-        # [Code existant inchangé]
-        pass
+    def _parse_vehicle_cards_bs4(self, html_content):
+        """
+        Équivalent de _parse_vehicle_cards avec BeautifulSoup, utilisé en
+        secours si selectolax échoue sur un HTML mal formé.
+        
+        Args:
+            html_content (str): Contenu HTML de l'email
+            
+        Returns:
+            list: Champs bruts (textes et liens) de chaque annonce
+        """
+        soup = BeautifulSoup(html_content, "lxml")
+        cards = []
+        
+        for table in _SEL_TABLES.select(soup):
+            details_link = None
+            for link in _SEL_LINKS.select(table):
+                if link.text.strip() == "Détails":
+                    details_link = link.get('href')
+                    break
+            
+            title_elem = _SEL_TITLE.select_one(table) or _SEL_TITLE_ALT.select_one(table)
+            price_elem = _SEL_PRICE.select_one(table)
+            details_elem = _SEL_DETAILS.select_one(table)
+            img_elem = _SEL_IMAGE.select_one(table)
+            
+            cards.append({
+                "details_link": details_link,
+                "title": title_elem.text if title_elem else None,
+                "price": price_elem.text if price_elem else None,
+                "details": details_elem.text if details_elem else None,
+                "image_url": img_elem.get('src') if img_elem else None
+            })
+        
+        return cards
+    
+    def extract_car_listings(self, html_content, scraped_at=None):
+        """
+        Extrait les annonces automobiles du contenu HTML d'un email d'alerte.
+        
+        Args:
+            html_content (str): Contenu HTML de l'email
+            scraped_at (str, optional): Date d'extraction (ISO), maintenant par défaut
+            
+        Returns:
+            list: Liste des annonces extraites
+        """
+        listings = []
+        
+        # Chaque annonce est dans une table 'border-container' : si la classe
+        # n'apparaît pas dans le HTML, inutile de le parser
+        if not html_content or 'border-container' not in html_content:
+            return listings
+        
+        if LexborHTMLParser is None:
+            cards = self._parse_vehicle_cards_bs4(html_content)
+        else:
+            try:
+                cards = self._parse_vehicle_cards(html_content)
+            except Exception as e:
+                logger.warning(f"Échec du parsing selectolax, utilisation de BeautifulSoup: {str(e)}")
+                cards = self._parse_vehicle_cards_bs4(html_content)
+        
+        # Toutes les annonces d'un même email partagent la même date d'extraction
+        scraped_at = scraped_at or datetime.now().isoformat()
+        
+        for card in cards:
+            try:
+                # Titre du véhicule
+                if card["title"] is None:
+                    continue
+                
+                # Nettoyer l'URL de l'annonce (retirer les paramètres de tracking)
+                details_link = card["details_link"]
+                listing_url = details_link
+                if details_link:
+                    url_match = _URL_RE.search(details_link)
+                    if url_match:
+                        listing_url = f"https://www.autoscout24.be/fr/offres/{url_match.group(1)}"
+                
+                title = sanitize_text(card["title"])
+                
+                # Prix
+                if card["price"] is not None:
+                    price_text = sanitize_text(card["price"])
+                    price = _parse_price(price_text)
+                else:
+                    price_text = "Prix non spécifié"
+                    price = None
+                
+                # Détails (kilométrage, date de mise en circulation...)
+                details_text = sanitize_text(card["details"]) if card["details"] is not None else ""
+                
+                mileage = None
+                mileage_match = _MILEAGE_RE.search(details_text)
+                if mileage_match:
+                    mileage = int(''.join(_DIGITS_RE.findall(mileage_match.group(1))))
+                
+                year = None
+                year_match = _YEAR_RE.search(details_text)
+                if year_match:
+                    year = int(year_match.group(2))
+                
+                # Marque et modèle à partir du titre
+                make, model = _split_make_model(title)
+                
+                listings.append({
+                    "title": title,
+                    "make": make,
+                    "model": model,
+                    "price": price,
+                    "price_text": price_text,
+                    "details": details_text,
+                    "mileage": mileage,
+                    "year": year,
+                    "url": listing_url,
+                    "image_url": card["image_url"],
+                    "source": "gmail_api",
+                    "scraped_at": scraped_at
+                })
+                
+                logger.debug("Annonce extraite: %s", title)
+            
+            except Exception as e:
+                logger.error(f"Erreur lors de l'extraction d'une annonce: {str(e)}")
+                continue
+        
+        return listings
     
     def mark_as_read(self, msg_id):
-        # [Code existant inchangé]
-        pass
+        """
+        Marque un email comme lu.
+        
+        Args:
+            msg_id (str): ID de l'email
+            
+        Returns:
+            bool: True si l'opération a réussi, False sinon
+        """
+        return self.mark_emails_as_read([msg_id])
     
-    def process_emails(self, max_emails=5, unread_only=True, mark_as_read=True):
-        # [Code existant inchangé]
-        pass
\ No newline at end of file
+    def mark_emails_as_read(self, msg_ids):
+        """
+        Marque plusieurs emails comme lus en un seul appel par bloc d'IDs.
+        
+        Args:
+            msg_ids (list): IDs des emails
+            
+        Returns:
+            bool: True si l'opération a réussi, False sinon
+        """
+        if not msg_ids:
+            return True
+        
+        if not self._ensure_service():
+            return False
+        
+        if not self.can_modify:
+            logger.warning("Le token n'inclut pas le scope gmail.modify: emails non marqués comme lus "
+                           "(lancer setup_notifications.py pour l'accorder)")
+            return False
+        
+        try:
+            # batchModify accepte jusqu'à 1000 IDs par appel
+            for chunk in _chunked(msg_ids, 1000):
+                self.service.users().messages().batchModify(
+                    userId='me',
+                    body={'ids': chunk, 'removeLabelIds': ['UNREAD']}
+                ).execute()
+            
+            logger.info(f"{len(msg_ids)} emails marqués comme lus")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Erreur lors du marquage des emails comme lus: {str(e)}")
+            return False
+    
+    def process_emails(self, max_emails=5, unread_only=True, mark_as_read=True, incremental=False):
+        """
+        Traite les emails d'alerte AutoScout24 et en extrait les annonces.
+        
+        Args:
+            max_emails (int): Nombre maximum d'emails à traiter (ignoré pour
+                              une synchronisation incrémentale)
+            unread_only (bool): Si True, ne traite que les emails non lus
+            mark_as_read (bool): Si True, marque les emails traités comme lus
+            incremental (bool): Si True, ne récupère que les emails arrivés
+                                depuis le dernier traitement (notifications push)
+            
+        Returns:
+            list: Liste des annonces extraites, dédupliquées par URL
+        """
+        emails = None
+        history_id = None
+        
+        if incremental:
+            start_history_id = self._load_history_id()
+            if start_history_id:
+                emails, history_id = self.fetch_new_emails(start_history_id, unread_only=unread_only)
+        
+        if emails is None:
+            if incremental:
+                # Relever l'historyId avant la recherche pour ne manquer aucun
+                # email arrivé pendant le traitement, et rechercher sans limite
+                # puisque l'historique repartira de ce point
+                history_id = self.get_current_history_id()
+                max_emails = None
+            emails = self.fetch_autoscout_emails(max_emails=max_emails, unread_only=unread_only)
+            if emails is None:
+                return []
+        
+        if not emails:
+            if incremental and history_id:
+                self._save_history_id(history_id)
+            return []
+        
+        all_listings = []
+        
+        msg_ids = [email['id'] for email in emails]
+        email_contents = []
+        parsed = []
+        # Faux si un email n'a pas pu être récupéré : l'historyId n'avance
+        # pas pour qu'il soit relu au prochain traitement
+        all_fetched = True
+        
+        # Une seule date pour tous les emails et annonces d'une même exécution
+        run_at = datetime.now().isoformat()
+        
+        # Le parsing HTML (lexbor/lxml) libère le GIL : les emails d'un bloc
+        # sont traités sur plusieurs threads pendant que le bloc suivant est
+        # récupéré auprès de l'API Gmail
+        max_workers = min(MAX_PARSE_WORKERS, len(msg_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for chunk in _chunked(msg_ids, GMAIL_BATCH_SIZE):
+                for msg_id, email_content in zip(chunk, self.get_email_contents(chunk, run_at)):
+                    if email_content is None:
+                        logger.warning(f"Email {msg_id} non récupéré")
+                        all_fetched = False
+                        continue
+                    if not email_content.get('html_content'):
+                        logger.warning(f"Pas de contenu HTML pour l'email {msg_id}")
+                        continue
+                    # L'historique contient tous les emails reçus, pas seulement les alertes
+                    if AUTOSCOUT_SENDER not in (email_content.get('sender') or ''):
+                        continue
+                    email_contents.append(email_content)
+                    parsed.append(executor.submit(self.extract_car_listings, email_content['html_content'], run_at))
+            
+            results = []
+            for email_content, future in zip(email_contents, parsed):
+                listings = future.result()
+                if listings:
+                    logger.info(f"{len(listings)} annonces extraites de l'email: {email_content.get('subject')}")
+                    results.append((email_content['received_at'], listings))
+        
+        # Les emails les plus récents d'abord : leurs annonces (prix à jour)
+        # priment sur celles des alertes plus anciennes
+        results.sort(key=lambda result: result[0], reverse=True)
+        for _, listings in results:
+            all_listings.extend(listings)
+        
+        processed_ids = [email_content['id'] for email_content in email_contents]
+        
+        if mark_as_read:
+            self.mark_emails_as_read(processed_ids)
+        
+        if incremental and history_id:
+            if all_fetched:
+                self._save_history_id(history_id)
+            else:
+                logger.warning("historyId non enregistré: les emails non récupérés seront relus au prochain traitement")
+        
+        # Une même annonce revient souvent dans plusieurs alertes : seule
+        # l'occurrence la plus récente est conservée
+        seen = {}
+        missing_url = 0
+        for listing in all_listings:
+            if listing.get('url'):
+                seen.setdefault(listing['url'], listing)
+            else:
+                missing_url += 1
+        
+        # Sans URL, une annonce ne peut être ni dédupliquée ni enregistrée
+        if missing_url:
+            logger.warning(f"{missing_url} annonces sans URL ignorées")
+        
+        duplicates = len(all_listings) - missing_url - len(seen)
+        if duplicates:
+            logger.info(f"{duplicates} annonces en double ignorées")
+        
+        return list(seen.values())
\ No newline at end of file
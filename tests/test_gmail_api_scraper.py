@@ -0,0 +1,242 @@
+# tests/test_gmail_api_scraper.py
+import base64
+from unittest import mock
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from scrapers.gmail_api_scraper import GmailApiScraper, _parse_price, _split_make_model
+
+
+def _encode(text, charset='utf-8'):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode('ascii')
+
+
+def _html_part(html, charset='utf-8'):
+    return {
+        'mimeType': 'text/html',
+        'headers': [{'name': 'Content-Type', 'value': f'text/html; charset="{charset}"'}],
+        'body': {'data': _encode(html, charset)},
+    }
+
+
+# Extrait du gabarit des alertes AutoScout24 : une table par annonce, avec
+# un ancien prix barré et un lien de suivi avant le vrai lien "Détails"
+ALERT_HTML = """
+<html><body>
+<table class="border-container" width="100%"><tr><td>
+  <img alt="vehicle" src="https://img.autoscout24.net/bmw.jpg">
+  <div class="card-title"><a href="#">BMW X1 sDrive18i</a></div>
+  <a class="price-old" href="#">€ 30 000,-</a>
+  <a class="price" href="#">€ 25 000,-</a>
+  <a class="small-details" href="#">120 000 km • 04/2019 • Essence</a>
+  <a data-href="https://tracker.example/ignored" href="https://click.rtm.autoscout24.com/?u=https%3A//www.autoscout24.be/fr/offres/bmw-x1-essence-1234?utm_source=alert">Détails</a>
+</td></tr></table>
+<table class="border-container" width="100%"><tr><td>
+  <div class="card-right-part-ellipse-container"><a href="#">Alfa Romeo Giulia 2.2</a></div>
+  <a class="small-details" href="#">45.000 km • 11/2021</a>
+  <a href="https://www.autoscout24.be/fr/offres/alfa-romeo-giulia-5678?utm_source=alert">Détails</a>
+</td></tr></table>
+</body></html>
+"""
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    scraper = GmailApiScraper(
+        credentials_file=str(tmp_path / 'credentials.json'),
+        token_file=str(tmp_path / 'token.json'),
+        history_file=str(tmp_path / 'history_id'),
+    )
+    # Service déjà authentifié : aucun appel réseau dans les tests
+    scraper.service = mock.MagicMock()
+    return scraper
+
+
+def _email(msg_id, received_at, html):
+    return {
+        'id': msg_id,
+        'sender': 'AutoScout24 <no-reply@rtm.autoscout24.com>',
+        'subject': f'Alerte {msg_id}',
+        'received_at': received_at,
+        'html_content': html,
+    }
+
+
+def _serve_emails(scraper, emails):
+    """
+    Remplace les appels à l'API Gmail par les emails donnés.
+    """
+    by_id = {email['id']: email for email in emails}
+    scraper.fetch_autoscout_emails = mock.Mock(return_value=[{'id': email['id']} for email in emails])
+    scraper.get_email_contents = mock.Mock(
+        side_effect=lambda msg_ids, processed_at=None: [by_id.get(msg_id) for msg_id in msg_ids]
+    )
+
+
+@pytest.mark.parametrize("price_text, expected", [
+    ("€ 12 250,-", 12250),
+    ("€ 12.250,-", 12250),
+    ("€ 1.250.000,-", 1250000),
+    ("€ 950,-", 950),
+    ("Prix non spécifié", None),
+])
+def test_parse_price(price_text, expected):
+    assert _parse_price(price_text) == expected
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("BMW X1 sDrive18i", ("BMW", "X1 sDrive18i")),
+    ("Alfa Romeo Giulia 2.2", ("Alfa Romeo", "Giulia 2.2")),
+    ("Land Rover Range Rover Evoque", ("Land Rover", "Range Rover Evoque")),
+    ("Lynk & Co 01", ("Lynk & Co", "01")),
+    ("Alfa Romeo", ("Alfa Romeo", None)),
+    ("Alfasud", ("Alfasud", None)),
+    ("Tesla", ("Tesla", None)),
+])
+def test_split_make_model(title, expected):
+    assert _split_make_model(title) == expected
+
+
+def test_parse_message_finds_nested_html(scraper):
+    # multipart/mixed > multipart/related > multipart/alternative > text/html,
+    # avec un message transféré contenant lui aussi du HTML
+    message = {
+        'id': 'msg1',
+        'internalDate': '1700000000000',
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [
+                {'name': 'From', 'value': 'AutoScout24 <no-reply@rtm.autoscout24.com>'},
+                {'name': 'Subject', 'value': 'Nouvelles annonces'},
+                {'name': 'Date', 'value': 'Tue, 14 Nov 2023 22:13:20 +0000'},
+            ],
+            'parts': [
+                {
+                    'mimeType': 'message/rfc822',
+                    'parts': [_html_part('<p>transféré</p>')],
+                },
+                {
+                    'mimeType': 'multipart/related',
+                    'parts': [{
+                        'mimeType': 'multipart/alternative',
+                        'parts': [
+                            {'mimeType': 'text/plain', 'body': {'data': _encode('texte')}},
+                            _html_part('<p>Prix: € 9 950,- (Citroën)</p>', 'iso-8859-15'),
+                        ],
+                    }],
+                },
+            ],
+        },
+    }
+    
+    content = scraper._parse_message(message, processed_at='2023-11-14T23:00:00')
+    
+    assert content['html_content'] == '<p>Prix: € 9 950,- (Citroën)</p>'
+    assert content['subject'] == 'Nouvelles annonces'
+    assert content['sender'] == 'AutoScout24 <no-reply@rtm.autoscout24.com>'
+    assert content['received_at'] == 1700000000000
+    assert content['processed_at'] == '2023-11-14T23:00:00'
+
+
+def test_parse_message_warns_when_parts_are_cut_off(scraper, caplog):
+    # Conteneur au-delà de la profondeur demandée par MESSAGE_FIELDS
+    message = {
+        'id': 'msg2',
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'parts': [{'mimeType': 'multipart/alternative'}],
+        },
+    }
+    
+    content = scraper._parse_message(message)
+    
+    assert content['html_content'] is None
+    assert 'trop imbriquées' in caplog.text
+
+
+def test_extract_car_listings(scraper):
+    listings = scraper.extract_car_listings(ALERT_HTML, scraped_at='2023-11-14T23:00:00')
+    
+    assert [listing['url'] for listing in listings] == [
+        'https://www.autoscout24.be/fr/offres/bmw-x1-essence-1234',
+        'https://www.autoscout24.be/fr/offres/alfa-romeo-giulia-5678',
+    ]
+    bmw, alfa = listings
+    assert (bmw['make'], bmw['model']) == ('BMW', 'X1 sDrive18i')
+    assert (bmw['price'], bmw['price_text']) == (25000, '€ 25 000,-')
+    assert (bmw['mileage'], bmw['year']) == (120000, 2019)
+    assert bmw['image_url'] == 'https://img.autoscout24.net/bmw.jpg'
+    assert (alfa['make'], alfa['model']) == ('Alfa Romeo', 'Giulia 2.2')
+    assert (alfa['price'], alfa['price_text']) == (None, 'Prix non spécifié')
+    assert (alfa['mileage'], alfa['year']) == (45000, 2021)
+    assert all(listing['scraped_at'] == '2023-11-14T23:00:00' for listing in listings)
+
+
+def test_card_parsers_agree(scraper):
+    pytest.importorskip('selectolax')
+    assert scraper._parse_vehicle_cards(ALERT_HTML) == scraper._parse_vehicle_cards_bs4(ALERT_HTML)
+
+
+def test_process_emails_keeps_newest_duplicate(scraper):
+    older = _email('old', 1000, ALERT_HTML)
+    newer = _email('new', 2000, ALERT_HTML.replace('€ 25 000,-', '€ 23 500,-'))
+    _serve_emails(scraper, [older, newer])
+    
+    listings = scraper.process_emails(mark_as_read=False)
+    
+    prices = {listing['url']: listing['price'] for listing in listings}
+    assert len(listings) == 2
+    assert prices['https://www.autoscout24.be/fr/offres/bmw-x1-essence-1234'] == 23500
+
+
+def _history_error(status):
+    return HttpError(mock.Mock(status=status, reason='error'), b'{}')
+
+
+def test_incremental_sync_saves_history_id(scraper):
+    scraper._save_history_id('100')
+    _serve_emails(scraper, [_email('new', 2000, ALERT_HTML)])
+    scraper.fetch_new_emails = mock.Mock(return_value=([{'id': 'new'}], '200'))
+    
+    listings = scraper.process_emails(mark_as_read=False, incremental=True)
+    
+    assert len(listings) == 2
+    scraper.fetch_new_emails.assert_called_once_with('100', unread_only=True)
+    scraper.fetch_autoscout_emails.assert_not_called()
+    assert scraper._load_history_id() == '200'
+
+
+def test_incremental_sync_keeps_history_id_when_an_email_is_missing(scraper):
+    scraper._save_history_id('100')
+    _serve_emails(scraper, [_email('new', 2000, ALERT_HTML)])
+    scraper.fetch_new_emails = mock.Mock(return_value=([{'id': 'new'}, {'id': 'lost'}], '200'))
+    
+    scraper.process_emails(mark_as_read=False, incremental=True)
+    
+    assert scraper._load_history_id() == '100'
+
+
+def test_expired_history_falls_back_to_full_search(scraper):
+    scraper._save_history_id('100')
+    _serve_emails(scraper, [_email('new', 2000, ALERT_HTML)])
+    history = scraper.service.users.return_value.history.return_value
+    history.list.return_value.execute.side_effect = _history_error(404)
+    scraper.get_current_history_id = mock.Mock(return_value='300')
+    
+    listings = scraper.process_emails(max_emails=5, mark_as_read=False, incremental=True)
+    
+    assert len(listings) == 2
+    scraper.fetch_autoscout_emails.assert_called_once_with(max_emails=None, unread_only=True)
+    assert scraper._load_history_id() == '300'
+
+
+def test_history_error_keeps_history_id(scraper):
+    scraper._save_history_id('100')
+    _serve_emails(scraper, [])
+    history = scraper.service.users.return_value.history.return_value
+    history.list.return_value.execute.side_effect = _history_error(503)
+    
+    assert scraper.process_emails(mark_as_read=False, incremental=True) == []
+    scraper.fetch_autoscout_emails.assert_not_called()
+    assert scraper._load_history_id() == '100'
@@ -0,0 +1,32 @@
+# tests/test_helpers.py
+import pytest
+
+from utils.helpers import sanitize_text, extract_number_from_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    (None, ""),
+    ("", ""),
+    ("BMW X1", "BMW X1"),
+    ("  BMW X1  ", "BMW X1"),
+    ("BMW   X1", "BMW X1"),
+    ("BMW\nX1\t sDrive", "BMW X1 sDrive"),
+    ("€ 12 250,-", "€ 12 250,-"),
+    ("€\xa012\xa0250,-", "€ 12 250,-"),
+])
+def test_sanitize_text(text, expected):
+    assert sanitize_text(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    (None, None),
+    ("Prix non spécifié", None),
+    ("10 000 €", 10000),
+    ("12,5 %", 12.5),
+    ("1.6 TDI", 1.6),
+    ("120 000 km, 04/2019", 120000),
+])
+def test_extract_number_from_text(text, expected):
+    result = extract_number_from_text(text)
+    assert result == expected
+    assert type(result) is type(expected)
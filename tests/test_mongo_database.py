@@ -0,0 +1,97 @@
+# tests/test_mongo_database.py
+from unittest import mock
+
+import pytest
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database.mongo_database import MongoDatabase
+
+
+@pytest.fixture
+def database():
+    database = MongoDatabase()
+    # Base déjà connectée : bulk_write est simulé
+    database.db = mock.MagicMock()
+    database.db.listings.bulk_write.return_value = mock.Mock(upserted_count=1, matched_count=1)
+    return database
+
+
+def _operations(database):
+    (operations,), kwargs = database.db.listings.bulk_write.call_args
+    assert kwargs == {'ordered': False}
+    return operations
+
+
+def test_store_listings_upserts_by_url(database):
+    listing = {
+        'url': 'https://www.autoscout24.be/fr/offres/bmw-x1-1234',
+        'title': 'BMW X1',
+        'price': 25000,
+        'price_text': '€ 25 000,-',
+        'mileage': 120000,
+        'estimated_value': 27000,
+    }
+    
+    result = database.store_listings([listing])
+    
+    assert result == {'nb_inserts': 1, 'nb_updates': 1}
+    assert _operations(database) == [UpdateOne(
+        {'url': listing['url']},
+        {
+            '$set': {
+                'url': listing['url'],
+                'title': 'BMW X1',
+                'price': 25000,
+                'price_text': '€ 25 000,-',
+                'mileage': 120000,
+                'updated_at': mock.ANY,
+            },
+            # Les champs calculés ne sont écrits qu'à la création
+            '$setOnInsert': {
+                'estimated_value': 27000,
+                'created_at': mock.ANY,
+                'contacted': False,
+                'visited': False,
+            },
+        },
+        upsert=True
+    )]
+
+
+def test_store_listings_keeps_known_values_for_missing_fields(database):
+    listing = {
+        'url': 'https://www.autoscout24.be/fr/offres/alfa-romeo-giulia-5678',
+        'title': 'Alfa Romeo Giulia',
+        'price': None,
+        'price_text': 'Prix non spécifié',
+        'mileage': None,
+    }
+    
+    database.store_listings([listing])
+    
+    update = _operations(database)[0]._doc
+    assert set(update['$set']) == {'url', 'title', 'updated_at'}
+    # price_text suit price : le prix connu et son texte sont conservés ensemble
+    assert update['$setOnInsert']['price'] is None
+    assert update['$setOnInsert']['price_text'] == 'Prix non spécifié'
+    assert update['$setOnInsert']['mileage'] is None
+
+
+def test_store_listings_skips_listings_without_url(database):
+    assert database.store_listings([{'title': 'Sans URL', 'url': None}]) == {'nb_inserts': 0, 'nb_updates': 0}
+    database.db.listings.bulk_write.assert_not_called()
+
+
+def test_store_listings_reports_partial_bulk_write(database):
+    database.db.listings.bulk_write.side_effect = BulkWriteError({
+        'nUpserted': 1,
+        'nMatched': 0,
+        'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}],
+    })
+    listings = [
+        {'url': 'https://www.autoscout24.be/fr/offres/a', 'title': 'A'},
+        {'url': 'https://www.autoscout24.be/fr/offres/b', 'title': 'B'},
+    ]
+    
+    assert database.store_listings(listings) == {'nb_inserts': 1, 'nb_updates': 0}
@@ -0,0 +1,67 @@
+# tests/test_webhook_server.py
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+import pytest
+
+import webhook_server
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """
+    Remplace le processus de traitement : chaque traitement confié est
+    ajouté à la liste retournée, sans être exécuté.
+    """
+    futures = []
+    
+    def submit_pipeline():
+        future = Future()
+        webhook_server._current_pipeline = future
+        futures.append(future)
+        return future
+    
+    monkeypatch.setattr(webhook_server, '_submit_pipeline', submit_pipeline)
+    monkeypatch.setattr(webhook_server, '_current_pipeline', None)
+    monkeypatch.setattr(webhook_server, '_rerun_requested', False)
+    return futures
+
+
+def test_notifications_during_a_run_are_coalesced(submitted):
+    assert webhook_server.trigger_pipeline() is True
+    assert webhook_server.trigger_pipeline() is False
+    assert webhook_server.trigger_pipeline() is False
+    assert len(submitted) == 1
+    
+    # Une seule relance pour toutes les notifications reçues pendant le traitement
+    submitted[0].set_result(None)
+    webhook_server._on_pipeline_done(submitted[0])
+    assert len(submitted) == 2
+    assert webhook_server._rerun_requested is False
+    
+    submitted[1].set_result(None)
+    webhook_server._on_pipeline_done(submitted[1])
+    assert len(submitted) == 2
+    assert webhook_server._current_pipeline is None
+
+
+def test_failed_run_still_reruns(submitted):
+    webhook_server.trigger_pipeline()
+    webhook_server.trigger_pipeline()
+    submitted[0].set_exception(RuntimeError("échec"))
+    
+    webhook_server._on_pipeline_done(submitted[0])
+    
+    assert len(submitted) == 2
+
+
+def test_webhook_answers_202_and_dispatches(monkeypatch):
+    dispatched = threading.Event()
+    monkeypatch.setattr(webhook_server, 'trigger_pipeline', mock.Mock(side_effect=lambda: dispatched.set() or True))
+    
+    response = webhook_server.app.test_client().post('/webhook/gmail', json={})
+    
+    assert response.status_code == 202
+    assert response.get_json() == {'status': 'success', 'message': 'Traitement démarré'}
+    assert dispatched.wait(timeout=5)
@@ -1,34 +1,163 @@
 # utils/helpers.py
+import re
 import random
 import time
+import queue
+import atexit
 import logging
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from functools import lru_cache
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("lovacar.log"),
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler dont les écritures passent par un tampon de 64 Kio.
+    
+    Les messages ne sont pas vidés un par un sur le disque : le tampon est
+    vidé par flush(), appelé par _FlushingQueueListener dès que la file de
+    messages est vide, et à la fermeture du handler.
+    """
+    
+    def __init__(self, filename, buffer_size=65536, **kwargs):
+        self.buffer_size = buffer_size
+        super().__init__(filename, **kwargs)
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _FlushingQueueListener(QueueListener):
+    """
+    QueueListener qui vide ses handlers chaque fois que la file est vide :
+    une rafale de messages est écrite en une fois, sans que les derniers
+    restent en attente dans le tampon.
+    """
+    
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+
+class _RecordForwarder(logging.Handler):
+    """
+    Transmet les messages reçus d'un autre processus au logging de ce
+    processus, qui les écrit avec ses propres handlers.
+    """
+    
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+# Thread d'écriture des logs de ce processus
+_listener = None
+
+
+def configure_logging():
+    """
+    Configure le logging de l'application (fichier lovacar.log et console).
+    
+    Sans effet si le logging est déjà configuré : le fichier de log n'est
+    ouvert qu'une fois par processus, même si le module est réimporté.
+    
+    Les messages sont placés dans une file et écrits par un thread dédié :
+    les appels au logger ne bloquent pas sur les écritures disque.
+    """
+    global _listener
+    
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        # Fichier ouvert au premier message seulement : un processus dont les
+        # logs sont transmis à un autre (forward_logging) ne l'ouvre jamais
+        BufferedFileHandler("lovacar.log", delay=True),
         logging.StreamHandler()
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    _listener = _FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Écrire les derniers messages en file avant la fin du processus
+    atexit.register(_listener.stop)
+    
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+def listen_forwarded_logs(log_queue):
+    """
+    Écrit, avec le logging de ce processus, les messages que d'autres
+    processus placent dans log_queue (voir forward_logging) : lovacar.log
+    n'a qu'un seul processus écrivain.
+    
+    Args:
+        log_queue (multiprocessing.Queue): File partagée avec les autres processus
+    """
+    listener = QueueListener(log_queue, _RecordForwarder())
+    listener.start()
+    atexit.register(listener.stop)
+
+def forward_logging(log_queue):
+    """
+    Transmet les logs de ce processus au processus qui écoute log_queue
+    (voir listen_forwarded_logs) au lieu de les écrire soi-même.
+    
+    Args:
+        log_queue (multiprocessing.Queue): File partagée avec le processus principal
+    """
+    global _listener
+    
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    
+    if _listener is not None:
+        atexit.unregister(_listener.stop)
+        _listener.stop()
+        _listener = None
+    
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+# Configuration du logging
+configure_logging()
 
 logger = logging.getLogger("lovacar")
 
+# Générateur propre au module pour les délais anti-détection
+_rand = random.Random()
+
+# Expressions régulières utilisées par les fonctions de nettoyage
+_WS_RE = re.compile(r'\s+')
+# Nombre avec espaces de milliers éventuels (« 10 000 ») et partie décimale
+_NUM_RE = re.compile(r'\d[\d ]*(?:[.,]\d+)?')
+
 def get_random_delay(min_delay=3, max_delay=7):
     """
     Génère un délai aléatoire entre min_delay et max_delay.
     Utile pour éviter la détection de bot.
     """
-    return random.uniform(min_delay, max_delay)
+    return _rand.uniform(min_delay, max_delay)
 
 def wait_random_delay(min_delay=3, max_delay=7):
     """
     Attend un délai aléatoire entre min_delay et max_delay.
     """
     delay = get_random_delay(min_delay, max_delay)
-    logger.debug(f"Attente de {delay:.2f} secondes...")
+    logger.debug("Attente de %.2f secondes...", delay)
     time.sleep(delay)
     return delay
 
@@ -36,33 +165,45 @@ def format_timestamp():
     """
     Retourne un timestamp formaté pour les noms de fichiers.
     """
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+    return time.strftime("%Y%m%d_%H%M%S")
 
+@lru_cache(maxsize=4096)
 def sanitize_text(text):
     """
     Nettoie un texte en supprimant les caractères spéciaux et les espaces multiples.
+    
+    Le résultat est mis en cache (le texte doit être une chaîne ou None).
     """
     if not text:
         return ""
+    # Cas courant : seuls des espaces simples (tous les autres blancs, dont
+    # l'espace insécable, sont non imprimables), rien à remplacer
+    if text.isprintable() and '  ' not in text:
+        return text.strip()
     # Supprimer les caractères spéciaux et les espaces multiples
-    import re
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return _WS_RE.sub(' ', text).strip()
 
+@lru_cache(maxsize=4096)
 def extract_number_from_text(text):
     """
     Extrait un nombre à partir d'un texte.
-    Par exemple, "10 000 €" -> 10000
+    Par exemple, "10 000 €" -> 10000, "12,5 %" -> 12.5
+    
+    Le résultat est mis en cache : les mêmes prix reviennent souvent
+    d'une annonce à l'autre.
     """
     if not text:
         return None
-    import re
-    # Trouver tous les chiffres dans le texte
-    numbers = re.findall(r'\d+[\.,]?\d*', text.replace(' ', ''))
-    if numbers:
-        # Convertir la chaîne de caractères en nombre
+    # Premier nombre du texte, sans copier le texte pour en retirer les espaces
+    match = _NUM_RE.search(text)
+    if match:
+        number = match.group().replace(' ', '')
+        # Convertir la chaîne de caractères en nombre : entier sans séparateur
+        # décimal, décimal sinon
         try:
-            return float(numbers[0].replace(',', '.'))
+            if '.' not in number and ',' not in number:
+                return int(number)
+            return float(number.replace(',', '.'))
         except ValueError:
             return None
     return None
\ No newline at end of file
@@ -1,12 +1,154 @@
 # webhook_server.py
 from flask import Flask, request, jsonify
 import os
-import subprocess
+import json
 import logging
-from utils.helpers import logger
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.helpers import logger, listen_forwarded_logs, forward_logging
 
 app = Flask(__name__)
 
+# Réponse fixe aux notifications, sérialisée une seule fois
+ACCEPTED_BODY = json.dumps({'status': 'success', 'message': 'Traitement démarré'})
+
+# Étapes exécutées à chaque notification Gmail
+PIPELINE_ARGS = {'scrape': True, 'incremental': True, 'estimate': True, 'calculate': True}
+
+# Processus de traitement persistant, créé à la première notification
+_executor = None
+
+# File par laquelle le processus de traitement transmet ses logs
+_log_queue = None
+
+# Traitement en cours, et demande d'un nouveau passage reçue entre-temps
+_pipeline_lock = threading.RLock()
+_current_pipeline = None
+_rerun_requested = False
+
+# Notifications reçues, transmises au traitement par un thread dédié
+_notifications = queue.Queue()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def _init_worker(log_queue):
+    """
+    Prépare le processus de traitement : ses logs sont écrits par le serveur
+    et le script principal (scraper, Selenium, MongoDB) est importé une
+    seule fois.
+    """
+    forward_logging(log_queue)
+    import main  # noqa: F401
+
+def _run_pipeline(**kwargs):
+    """
+    Exécute le traitement dans le processus persistant.
+    """
+    import main
+    main.run_pipeline(**kwargs)
+
+def _on_pipeline_done(future):
+    """
+    Journalise l'échec éventuel d'un traitement lancé par le webhook et
+    relance un passage si des notifications sont arrivées pendant celui-ci.
+    """
+    global _current_pipeline, _rerun_requested
+    
+    exception = future.exception()
+    if exception is not None:
+        logger.error("Erreur lors du traitement des emails: %s", exception)
+    
+    with _pipeline_lock:
+        _current_pipeline = None
+        if not _rerun_requested:
+            return
+        _rerun_requested = False
+        try:
+            _submit_pipeline()
+        except Exception as e:
+            logger.error("Erreur lors de la relance du traitement: %s", e)
+
+def trigger_pipeline():
+    """
+    Démarre un traitement, ou regroupe la notification avec le traitement
+    en cours : Gmail envoie souvent plusieurs notifications rapprochées.
+    Un seul passage supplémentaire est alors exécuté à la fin du traitement
+    en cours, pour les emails arrivés après son démarrage.
+    
+    Returns:
+        bool: True si un traitement a été démarré, False s'il a été regroupé
+    """
+    global _rerun_requested
+    
+    with _pipeline_lock:
+        if _current_pipeline is not None:
+            _rerun_requested = True
+            return False
+        _submit_pipeline()
+        return True
+
+def _submit_pipeline():
+    """
+    Confie le traitement au processus persistant, recréé s'il s'est arrêté.
+    
+    Un seul processus : les traitements successifs s'exécutent l'un après
+    l'autre et ne se disputent pas l'historique Gmail.
+    """
+    global _executor, _current_pipeline, _log_queue
+    
+    # 'spawn' : le processus démarre sans hériter des threads du serveur
+    # (dont celui qui écrit les logs)
+    context = multiprocessing.get_context('spawn')
+    if _log_queue is None:
+        _log_queue = context.Queue()
+        listen_forwarded_logs(_log_queue)
+    
+    for _ in range(2):
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_log_queue,)
+            )
+        try:
+            future = _executor.submit(_run_pipeline, **PIPELINE_ARGS)
+            _current_pipeline = future
+            future.add_done_callback(_on_pipeline_done)
+            return future
+        except BrokenProcessPool:
+            logger.warning("Processus de traitement arrêté, redémarrage")
+            _executor = None
+    
+    raise RuntimeError("Impossible de démarrer le processus de traitement")
+
+def _dispatch_notifications():
+    """
+    Transmet les notifications reçues au processus de traitement, en dehors
+    des threads qui répondent aux requêtes HTTP.
+    """
+    while True:
+        _notifications.get()
+        try:
+            if not trigger_pipeline():
+                logger.info("Traitement déjà en cours, notification regroupée")
+        except Exception as e:
+            logger.error("Erreur lors du lancement du traitement: %s", e)
+
+def _ensure_dispatcher():
+    """
+    Démarre le thread de transmission des notifications s'il ne tourne pas.
+    """
+    global _dispatcher
+    
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(target=_dispatch_notifications, daemon=True)
+            _dispatcher.start()
+
 @app.route('/webhook/gmail', methods=['POST'])
 def gmail_webhook():
     """
@@ -15,15 +157,21 @@ def gmail_webhook():
     try:
         logger.info("Notification Gmail reçue!")
         
-        # Exécuter le script principal pour traiter les emails
-        subprocess.Popen(["python", "main.py", "--scrape", "--estimate", "--calculate"])
+        # Le traitement est lancé en arrière-plan : répondre immédiatement
+        _ensure_dispatcher()
+        _notifications.put(None)
         
-        return jsonify({'status': 'success', 'message': 'Traitement démarré'}), 200
+        return app.response_class(ACCEPTED_BODY, status=202, mimetype='application/json')
     
     except Exception as e:
-        logger.error(f"Erreur dans le webhook: {str(e)}")
+        logger.error("Erreur dans le webhook: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 if __name__ == '__main__':
+    from waitress import serve
+    
     logger.info("Démarrage du serveur webhook...")
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Serveur WSGI multithread, dans un seul processus : les notifications
+    # simultanées sont acceptées en parallèle et partagent le même
+    # processus de traitement
+    serve(app, host='0.0.0.0', port=5000, threads=8)